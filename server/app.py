@@ -1,16 +1,15 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 import cv2
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
-from PIL import Image
 import base64
-import io
+import json
 import os
 import logging
-from datetime import datetime
-from dotenv import load_dotenv
+import time
+import zlib
 
 # Import custom utilities
 from image_utils import EmotionPredictor
@@ -39,15 +38,6 @@ def get_custom_objects():
     except ImportError:
         logger.warning("Could not import Nadam/Adam optimizers")
     
-    # Handle legacy optimizers
-    try:
-        from tensorflow.keras.optimizers.legacy import Nadam as LegacyNadam
-        from tensorflow.keras.optimizers.legacy import Adam as LegacyAdam
-        custom_objects['Nadam'] = LegacyNadam
-        custom_objects['Adam'] = LegacyAdam
-    except ImportError:
-        pass
-    
     return custom_objects
 
 def load_model_safe(model_path):
@@ -64,17 +54,9 @@ def load_model_safe(model_path):
         logger.warning(f"Failed with custom objects: {e1}")
         
         try:
-            # Method 2: Load tanpa custom objects
+            # Method 2: Load tanpa custom objects (inference tidak butuh optimizer)
             model = keras.models.load_model(model_path, compile=False)
             logger.info("Model loaded without compilation")
-            
-            # Recompile dengan optimizer yang kompatibel
-            model.compile(
-                optimizer='adam',
-                loss='categorical_crossentropy',
-                metrics=['accuracy']
-            )
-            logger.info("Model recompiled with Adam optimizer")
             return model
             
         except Exception as e2:
@@ -92,13 +74,6 @@ def load_model_safe(model_path):
                     model = keras.models.model_from_json(model_json)
                     model.load_weights(model_path)
                     
-                    # Compile dengan optimizer yang sederhana
-                    model.compile(
-                        optimizer='adam',
-                        loss='categorical_crossentropy',
-                        metrics=['accuracy']
-                    )
-                    
                     logger.info("Model loaded from JSON + weights")
                     return model
                 else:
@@ -132,6 +107,58 @@ except Exception as e:
     logger.error(f"Failed to initialize predictor: {e}")
     predictor = None
 
+def read_request_body():
+    """
+    Baca body request, decompress jika Content-Encoding gzip/deflate
+    
+    Ukuran hasil decompress dibatasi MAX_CONTENT_LENGTH agar body kecil
+    tidak bisa mengembang tanpa batas (decompression bomb).
+    
+    Returns:
+        Body dalam bytes, atau None jika hasil decompress melebihi batas
+    
+    Raises:
+        ValueError: Jika body terkompres rusak atau terpotong
+    """
+    body = request.get_data()
+    encoding = (request.content_encoding or '').lower()
+    
+    if encoding in ('gzip', 'deflate'):
+        wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            body = decompressor.decompress(body, Config.MAX_CONTENT_LENGTH)
+        except zlib.error as e:
+            raise ValueError(f"Invalid {encoding} request body: {e}")
+        if decompressor.unconsumed_tail:
+            return None
+        if not decompressor.eof:
+            raise ValueError(f"Truncated {encoding} request body")
+    
+    return body
+
+def decode_image_bytes(image_bytes, grayscale=False):
+    """
+    Decode encoded image bytes langsung ke array BGR (atau grayscale) untuk OpenCV
+    
+    cv2.imdecode (libjpeg-turbo) dipakai sebagai jalur utama; PIL hanya
+    fallback untuk format yang tidak didukung OpenCV (misal GIF).
+    """
+    flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    image_array = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+    if image_array is not None:
+        return image_array
+    
+    # PIL hanya di-import untuk jalur fallback yang jarang dipakai
+    import io
+    from PIL import Image
+    
+    if grayscale:
+        return np.array(Image.open(io.BytesIO(image_bytes)).convert('L'))
+    
+    image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+
 @app.route('/')
 def index():
     """API information endpoint"""
@@ -158,52 +185,70 @@ def health():
 
 @app.route('/predict', methods=['POST'])
 def predict_emotion():
-    """Predict emotion from base64 encoded image"""
-    import time
-    start_time = time.time()  # ⏱️ Start timing
+    """
+    Predict emotion from base64 encoded image
+    
+    Juga menerima body JPEG/PNG mentah (Content-Type image/* atau
+    application/octet-stream) tanpa overhead base64 + JSON, dan body
+    yang dikompres dengan Content-Encoding gzip/deflate.
+    """
+    start_time = time.perf_counter()  # ⏱️ Start timing
+    profiling = Config.ENABLE_PROFILING
     
     if not predictor:
         return jsonify({'error': 'Predictor not initialized'}), 500
     
     try:
-        data = request.get_json()
-        if not data or 'image' not in data:
-            return jsonify({'error': 'No image data provided'}), 400
+        if profiling:
+            decode_start = time.perf_counter()
         
-        # Decode base64 image
-        decode_start = time.time()
-        image_data = data['image']
-        if image_data.startswith('data:image'):
-            image_data = image_data.split(',')[1]
+        try:
+            body = read_request_body()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if body is None:
+            return jsonify({'error': 'Decompressed request body too large'}), 413
         
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_bytes))
-        image_array = np.array(image)
-        decode_time = (time.time() - decode_start) * 1000
+        if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+            # Raw binary image
+            image_bytes = body
+            if not image_bytes:
+                return jsonify({'error': 'No image data provided'}), 400
+        else:
+            data = json.loads(body) if body else None
+            if not data or 'image' not in data:
+                return jsonify({'error': 'No image data provided'}), 400
+            
+            # Decode base64 image; prefix data URI opsional (field 'format' hanya informasi)
+            image_data = data['image']
+            if image_data.startswith('data:image'):
+                image_data = image_data.split(',')[1]
+            
+            image_bytes = base64.b64decode(image_data)
         
-        # Convert RGB to BGR for OpenCV
-        convert_start = time.time()
-        if len(image_array.shape) == 3:
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-        convert_time = (time.time() - convert_start) * 1000
+        # Decode langsung ke grayscale jika detector tidak butuh warna
+        image_array = decode_image_bytes(image_bytes, grayscale=not predictor.needs_color)
+        if profiling:
+            decode_time = (time.perf_counter() - decode_start) * 1000
         
         # Predict emotion
-        predict_start = time.time()
+        if profiling:
+            predict_start = time.perf_counter()
         results = predictor.predict_emotion(image_array)
-        predict_time = (time.time() - predict_start) * 1000
-        
-        total_time = (time.time() - start_time) * 1000
+        if profiling:
+            predict_time = (time.perf_counter() - predict_start) * 1000
         
-        # ⏱️ Add timing info to response
+        total_time = (time.perf_counter() - start_time) * 1000
         results['processing_time'] = round(total_time, 2)
-        results['timing_breakdown'] = {
-            'decode_ms': round(decode_time, 2),
-            'convert_ms': round(convert_time, 2), 
-            'predict_ms': round(predict_time, 2),
-            'total_ms': round(total_time, 2)
-        }
         
-        logger.info(f"🔥 Server Processing: {total_time:.1f}ms (decode: {decode_time:.1f}ms, predict: {predict_time:.1f}ms)")
+        # ⏱️ Timing breakdown hanya saat profiling aktif (ENABLE_PROFILING)
+        if profiling:
+            results['timing_breakdown'] = {
+                'decode_ms': round(decode_time, 2),
+                'predict_ms': round(predict_time, 2),
+                'total_ms': round(total_time, 2)
+            }
+            logger.info(f"🔥 Server Processing: {total_time:.1f}ms (decode: {decode_time:.1f}ms, predict: {predict_time:.1f}ms)")
         
         return jsonify(results)
         
@@ -227,15 +272,11 @@ def predict_emotion_file():
         
         # Read image file
         image_bytes = file.read()
-        image = Image.open(io.BytesIO(image_bytes))
-        image_array = np.array(image)
+        # Decode langsung ke grayscale jika detector tidak butuh warna
+        image_array = decode_image_bytes(image_bytes, grayscale=not predictor.needs_color)
         
-        # Convert RGB to BGR for OpenCV
-        if len(image_array.shape) == 3:
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-        
-        # Predict emotion
-        results = predictor.predict_emotion(image_array)
+        # Predict emotion; file upload bukan stream frame, jadi tanpa cache frame
+        results = predictor.predict_emotion(image_array, use_cache=False)
         
         return jsonify(results)
         
@@ -244,4 +285,4 @@ def predict_emotion_file():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=Config.FLASK_DEBUG, host=Config.HOST, port=Config.PORT)
+    app.run(debug=Config.DEBUG, use_reloader=False, host=Config.HOST, port=Config.PORT)
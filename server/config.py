@@ -13,25 +13,39 @@ class Config:
     # Server configuration
     HOST = os.environ.get('HOST', '127.0.0.1')
     PORT = int(os.environ.get('PORT', 5000))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))  # Gunicorn gthread worker threads
     
     # Model configuration with fallback paths
     MODEL_PATH = os.environ.get('MODEL_PATH')
     MODEL_JSON_PATH = os.environ.get('MODEL_JSON_PATH')
     CASCADE_PATH = os.environ.get('CASCADE_PATH')
+    
+    # Inference backend (TF-TRT FP16 untuk GPU, TFLite terkuantisasi untuk CPU, fallback ke Keras)
+    USE_TENSORRT = os.environ.get('USE_TENSORRT', 'True').lower() == 'true'
+    USE_TFLITE = os.environ.get('USE_TFLITE', 'True').lower() == 'true'
+    TFLITE_CALIBRATION_DIR = os.environ.get('TFLITE_CALIBRATION_DIR')
+    TFLITE_NUM_THREADS = int(os.environ.get('TFLITE_NUM_THREADS', 0))  # 0 = benchmark 1/2/4 saat startup
+    TFLITE_DELEGATE_PATH = os.environ.get('TFLITE_DELEGATE_PATH')
+    ENABLE_XLA = os.environ.get('ENABLE_XLA', 'True').lower() == 'true'  # Hanya untuk fallback Keras
 
     # Image processing configuration
     MAX_IMAGE_SIZE = int(os.environ.get('MAX_IMAGE_SIZE', 5 * 1024 * 1024))  # Default 5MB
     MIN_FACE_SIZE = int(os.environ.get('MIN_FACE_SIZE', 30))
+    MAX_FACES = int(os.environ.get('MAX_FACES', 3))
     CONFIDENCE_THRESHOLD = float(os.environ.get('CONFIDENCE_THRESHOLD', 0.7))
     ALLOWED_EXTENSIONS = set(os.environ.get('ALLOWED_EXTENSIONS', 'png,jpg,jpeg,gif,bmp').split(','))
     
     # Face detection parameters
+    FACE_DETECTOR = os.environ.get('FACE_DETECTOR', 'yunet').lower()  # 'yunet' atau 'haar'
+    YUNET_MODEL_PATH = os.environ.get('YUNET_MODEL_PATH', 'assets/face_detection_yunet_2023mar.onnx')
+    YUNET_SCORE_THRESHOLD = float(os.environ.get('YUNET_SCORE_THRESHOLD', 0.7))
     FACE_DETECTION_SCALE_FACTOR = float(os.environ.get('SCALE_FACTOR', 1.1))
     FACE_DETECTION_MIN_NEIGHBORS = int(os.environ.get('MIN_NEIGHBORS', 5))
     FACE_DETECTION_MIN_SIZE = (
         int(os.environ.get('MIN_SIZE_WIDTH', 30)), 
         int(os.environ.get('MIN_SIZE_HEIGHT', 30))
     )
+    DETECTION_MAX_DIMENSION = int(os.environ.get('DETECTION_MAX_DIMENSION', 640))
     
     # Noise reduction parameters
     ENABLE_GAUSSIAN_BLUR = os.environ.get('ENABLE_GAUSSIAN_BLUR', 'True').lower() == 'true'
@@ -58,6 +72,9 @@ class Config:
     MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 4))
     DETECTION_TIMEOUT = int(os.environ.get('DETECTION_TIMEOUT', 30))
     PROCESSING_CACHE_SIZE = int(os.environ.get('PROCESSING_CACHE_SIZE', 100))
+    # Cache frame terakhir hanya untuk satu stream webcam (entry dipakai bersama semua client)
+    ENABLE_PREDICTION_CACHE = os.environ.get('ENABLE_PREDICTION_CACHE', 'False').lower() == 'true'
+    PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 0.5))  # detik
     
     # Security Settings
     RATE_LIMIT_PER_MINUTE = int(os.environ.get('RATE_LIMIT_PER_MINUTE', 60))
@@ -91,11 +108,20 @@ class Config:
             'model_path': cls.MODEL_PATH,
             'model_json_path': cls.MODEL_JSON_PATH,
             'cascade_path': cls.CASCADE_PATH,
+            'use_tensorrt': cls.USE_TENSORRT,
+            'use_tflite': cls.USE_TFLITE,
             'confidence_threshold': cls.CONFIDENCE_THRESHOLD,
+            'prediction_cache': {
+                'enabled': cls.ENABLE_PREDICTION_CACHE,
+                'ttl_seconds': cls.PREDICTION_CACHE_TTL
+            },
             'face_detection': {
+                'detector': cls.FACE_DETECTOR,
+                'yunet_model_path': cls.YUNET_MODEL_PATH,
                 'scale_factor': cls.FACE_DETECTION_SCALE_FACTOR,
                 'min_neighbors': cls.FACE_DETECTION_MIN_NEIGHBORS,
-                'min_size': cls.FACE_DETECTION_MIN_SIZE
+                'min_size': cls.FACE_DETECTION_MIN_SIZE,
+                'max_dimension': cls.DETECTION_MAX_DIMENSION
             },
             'noise_reduction': {
                 'gaussian_blur': cls.ENABLE_GAUSSIAN_BLUR,
@@ -1,73 +1,378 @@
 import cv2
+import hashlib
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 import logging
+import os
+import threading
+import time
 from typing import List, Tuple, Dict, Any, Optional
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+def load_calibration_faces(directory: str, limit: int = 100) -> List[np.ndarray]:
+    """
+    Load wajah grayscale dari folder untuk kalibrasi quantization INT8
+
+    Args:
+        directory: Folder berisi crop wajah (png/jpg)
+        limit: Jumlah maksimal sample yang di-load
+
+    Returns:
+        List array float32 dengan shape (1, 48, 48, 1)
+    """
+    samples = []
+    for filename in sorted(os.listdir(directory)):
+        if len(samples) >= limit:
+            break
+        face = cv2.imread(os.path.join(directory, filename), cv2.IMREAD_GRAYSCALE)
+        if face is None:
+            continue
+        face = cv2.resize(face, (48, 48)).astype('float32') / 255.0
+        samples.append(face.reshape(1, 48, 48, 1))
+    
+    logger.info(f"Loaded {len(samples)} calibration faces from {directory}")
+    return samples
+
+def _calibration_fingerprint(rep_data: Optional[List[np.ndarray]]) -> str:
+    """Fingerprint data kalibrasi INT8 ('dynamic' jika tanpa data kalibrasi)"""
+    if not rep_data:
+        return 'dynamic'
+    digest = hashlib.sha1()
+    for sample in rep_data:
+        digest.update(np.ascontiguousarray(sample, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+def convert_to_tflite(model_path: str, rep_data: Optional[List[np.ndarray]] = None,
+                      keras_model=None) -> str:
+    """
+    Convert model Keras H5 ke TFLite (post-training quantization)
+    
+    Dengan data kalibrasi: full INT8 (input/output int8). Tanpa data
+    kalibrasi: dynamic-range quantization (weight int8, input/output
+    float) yang tidak butuh representative dataset, karena kalibrasi
+    dengan data random menurunkan akurasi.
+    
+    File .tflite di-cache di sebelah file H5, dengan sidecar .calib berisi
+    fingerprint data kalibrasi. Dibuat ulang jika file H5 lebih baru atau
+    data kalibrasi berubah (mis. TFLITE_CALIBRATION_DIR baru di-set).
+    
+    Args:
+        model_path: Path ke model H5
+        rep_data: Sample (1, 48, 48, 1) float32 untuk kalibrasi INT8,
+            dynamic-range quantization jika None
+        keras_model: Model yang sudah di-load sebelumnya
+    
+    Returns:
+        Path ke file .tflite
+    """
+    tflite_path = os.path.splitext(model_path)[0] + '.tflite'
+    calib_path = tflite_path + '.calib'
+    calib_fingerprint = _calibration_fingerprint(rep_data)
+    
+    if os.path.exists(tflite_path) and os.path.getmtime(tflite_path) >= os.path.getmtime(model_path):
+        cached_fingerprint = None
+        if os.path.exists(calib_path):
+            with open(calib_path) as f:
+                cached_fingerprint = f.read().strip()
+        if cached_fingerprint == calib_fingerprint:
+            logger.info(f"Using cached TFLite model from {tflite_path}")
+            return tflite_path
+        logger.info("Calibration data changed, rebuilding TFLite model")
+    
+    if keras_model is None:
+        keras_model = keras.models.load_model(model_path, compile=False)
+    
+    def representative_dataset():
+        for sample in rep_data:
+            yield [sample.astype(np.float32)]
+    
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if rep_data:
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+        quantization = 'INT8'
+    else:
+        logger.info("No calibration faces provided, using dynamic-range quantization")
+        quantization = 'dynamic-range'
+    
+    tflite_model = converter.convert()
+    with open(tflite_path, 'wb') as f:
+        f.write(tflite_model)
+    with open(calib_path, 'w') as f:
+        f.write(calib_fingerprint)
+    
+    logger.info(f"TFLite {quantization} model saved to {tflite_path}")
+    return tflite_path
+
+def convert_to_tensorrt(model_path: str, keras_model=None) -> str:
+    """
+    Convert model Keras ke TF-TRT FP16 engine (butuh GPU NVIDIA + TensorRT)
+    
+    SavedModel dan hasil konversi di-cache di sebelah file H5.
+    
+    Args:
+        model_path: Path ke model H5
+        keras_model: Model yang sudah di-load sebelumnya
+    
+    Returns:
+        Path ke folder SavedModel TF-TRT
+    """
+    from tensorflow.python.compiler.tensorrt import trt_convert as trt
+    
+    base_path = os.path.splitext(model_path)[0]
+    saved_model_dir = base_path + '_saved_model'
+    trt_dir = base_path + '_trt_fp16'
+    
+    if os.path.isdir(trt_dir) and os.path.getmtime(trt_dir) >= os.path.getmtime(model_path):
+        logger.info(f"Using cached TF-TRT engine from {trt_dir}")
+        return trt_dir
+    
+    if keras_model is None:
+        keras_model = keras.models.load_model(model_path, compile=False)
+    tf.saved_model.save(keras_model, saved_model_dir)
+    
+    converter = trt.TrtGraphConverterV2(
+        input_saved_model_dir=saved_model_dir,
+        precision_mode=trt.TrtPrecisionMode.FP16,
+        max_workspace_size_bytes=1 << 30
+    )
+    converter.convert()
+    
+    def input_fn():
+        # Build engine untuk single face dan batch maksimal
+        yield (np.zeros((1, 48, 48, 1), np.float32),)
+        yield (np.zeros((Config.MAX_FACES, 48, 48, 1), np.float32),)
+    
+    converter.build(input_fn=input_fn)
+    converter.save(trt_dir)
+    
+    logger.info(f"TF-TRT FP16 engine saved to {trt_dir}")
+    return trt_dir
+
 class EmotionPredictor:
     """
     Advanced emotion predictor dengan noise reduction dan robust face detection
     """
     
-    def __init__(self, model_path: str, cascade_path: str, preloaded_model=None):
+    def __init__(self, model_path: str, cascade_path: str, preloaded_model):
         """
         Initialize emotion predictor
         
         Args:
-            model_path: Path ke model H5
+            model_path: Path ke model H5 (dipakai untuk cache TFLite / TF-TRT)
             cascade_path: Path ke Haarcascade XML
-            preloaded_model: Model yang sudah di-load sebelumnya
+            preloaded_model: Model Keras yang sudah di-load (misal via
+                EmotionPredictor._load_model atau app.load_model_safe)
         """
         self.model_path = model_path
         self.cascade_path = cascade_path
         
-        # Load model
-        if preloaded_model is not None:
-            self.model = preloaded_model
-            logger.info("Using preloaded model")
-        else:
-            self.model = self._load_model()
+        if preloaded_model is None:
+            raise ValueError("preloaded_model is required")
+        self.model = preloaded_model
         
-        # Load Haarcascade
-        self.face_cascade = self._load_cascade()
+        # Inference backend: TF-TRT (GPU) -> TFLite (CPU) -> Keras
+        self._trt_infer = self._load_tensorrt() if Config.USE_TENSORRT else None
         
-        # Emotion labels sesuai dengan training
-        self.emotion_labels = {
-            0: "happy",
-            1: "sad", 
-            2: "neutral"
-        }
+        # TFLite interpreter tidak thread-safe, jadi invoke dijaga dengan lock
+        self._interpreter_lock = threading.Lock()
+        self.interpreter = None
+        if self._trt_infer is None and Config.USE_TFLITE:
+            self.interpreter = self._load_tflite()
+        
+        # Keras fallback: trace forward pass sekali sebagai tf.function
+        self._predict_fn = None
+        if self._trt_infer is None and self.interpreter is None:
+            self._predict_fn = self._build_predict_fn()
+        
+        # Face detector: YuNet (OpenCV DNN) jika model ONNX tersedia, fallback ke Haarcascade
+        self._detector_lock = threading.Lock()
+        self.face_detector = self._load_yunet() if Config.FACE_DETECTOR == 'yunet' else None
+        self.face_cascade = self._load_cascade() if self.face_detector is None else None
+        
+        # Emotion labels sesuai dengan urutan output training (index = class id)
+        self.emotion_labels = ("happy", "sad", "neutral")
         
         # Confidence threshold
         self.confidence_threshold = Config.CONFIDENCE_THRESHOLD
         
+        # Cache (frame_key, result, timestamp) dari prediksi terakhir
+        self._last_prediction = None
+        
+        # Buffer input model per thread (lihat _get_input_buffer)
+        self._thread_local = threading.local()
+        
+        # Warmup agar request pertama tidak menanggung cold-start latency
+        self._warmup()
+        
         logger.info("EmotionPredictor initialized successfully")
     
-    def _load_model(self):
+    @staticmethod
+    def _load_model(model_path: str):
         """Load TensorFlow model dengan error handling"""
         try:
-            # Try loading dengan compile=False untuk avoid optimizer issues
-            model = keras.models.load_model(self.model_path, compile=False)
-            
-            # Recompile dengan simple optimizer
-            model.compile(
-                optimizer='adam',
-                loss='categorical_crossentropy',
-                metrics=['accuracy']
-            )
+            # compile=False: inference tidak butuh optimizer, sekaligus avoid optimizer issues
+            model = keras.models.load_model(model_path, compile=False)
             
-            logger.info(f"Model loaded successfully from {self.model_path}")
+            logger.info(f"Model loaded successfully from {model_path}")
             return model
             
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
     
+    def _load_tensorrt(self):
+        """Load TF-TRT FP16 engine jika CUDA tersedia"""
+        if not tf.config.list_physical_devices('GPU'):
+            return None
+        
+        try:
+            trt_dir = convert_to_tensorrt(self.model_path, keras_model=self.model)
+            
+            # Simpan reference ke loaded object agar variable tidak di-garbage collect
+            self._trt_model = tf.saved_model.load(trt_dir)
+            infer = self._trt_model.signatures['serving_default']
+            self._trt_input_name = list(infer.structured_input_signature[1].keys())[0]
+            
+            logger.info("TF-TRT FP16 engine ready")
+            return infer
+            
+        except Exception as e:
+            logger.warning(f"Failed to load TF-TRT engine, falling back to CPU backend: {e}")
+            return None
+    
+    def _create_interpreter(self, tflite_path: str, num_threads: int):
+        """Buat TFLite interpreter dengan XNNPACK delegate"""
+        delegates = []
+        if Config.TFLITE_DELEGATE_PATH:
+            delegates.append(tf.lite.experimental.load_delegate(Config.TFLITE_DELEGATE_PATH))
+        
+        interpreter = tf.lite.Interpreter(
+            model_path=tflite_path,
+            num_threads=num_threads,
+            experimental_delegates=delegates or None,
+            # BUILTIN resolver menerapkan XNNPACK delegate secara default
+            experimental_op_resolver_type=tf.lite.experimental.OpResolverType.BUILTIN
+        )
+        interpreter.allocate_tensors()
+        return interpreter
+    
+    def _pick_tflite_threads(self, tflite_path: str, candidates: Tuple[int, ...] = (1, 2, 4),
+                             runs: int = 20) -> int:
+        """
+        Benchmark jumlah thread interpreter dan pilih yang tercepat
+        
+        Model 48x48 sangat kecil sehingga overhead dispatch antar thread
+        sering lebih besar dari komputasinya; 1 thread sering menang.
+        """
+        timings = {}
+        
+        for num_threads in candidates:
+            interpreter = self._create_interpreter(tflite_path, num_threads)
+            input_details = interpreter.get_input_details()[0]
+            dummy = np.zeros(input_details['shape'], dtype=input_details['dtype'])
+            interpreter.set_tensor(input_details['index'], dummy)
+            interpreter.invoke()  # warmup
+            
+            start = time.perf_counter()
+            for _ in range(runs):
+                interpreter.invoke()
+            timings[num_threads] = (time.perf_counter() - start) / runs * 1000
+        
+        best = min(timings, key=timings.get)
+        logger.info(f"TFLite thread benchmark (ms/invoke): {timings}, using {best} thread(s)")
+        return best
+    
+    def _load_tflite(self):
+        """Convert model ke TFLite (INT8 jika ada data kalibrasi) dan siapkan interpreter"""
+        try:
+            rep_data = None
+            if Config.TFLITE_CALIBRATION_DIR:
+                rep_data = load_calibration_faces(Config.TFLITE_CALIBRATION_DIR)
+            
+            tflite_path = convert_to_tflite(self.model_path, rep_data, keras_model=self.model)
+            
+            num_threads = Config.TFLITE_NUM_THREADS or self._pick_tflite_threads(tflite_path)
+            interpreter = self._create_interpreter(tflite_path, num_threads)
+            
+            self._input_details = interpreter.get_input_details()[0]
+            self._output_details = interpreter.get_output_details()[0]
+            
+            logger.info(f"TFLite interpreter ready ({num_threads} threads)")
+            return interpreter
+            
+        except Exception as e:
+            logger.warning(f"Failed to load TFLite model, falling back to Keras: {e}")
+            return None
+    
+    def _build_predict_fn(self):
+        """
+        Trace forward pass Keras sebagai graph untuk input (N, 48, 48, 1)
+        
+        Dengan ENABLE_XLA, graph di-compile XLA sehingga chain Conv+BN+ELU
+        di-fuse dan overhead dispatch per-op hilang.
+        """
+        if Config.ENABLE_XLA:
+            tf.config.optimizer.set_jit(True)
+        
+        predict_fn = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec([None, 48, 48, 1], tf.float32)],
+            jit_compile=Config.ENABLE_XLA
+        )
+        predict_fn(tf.zeros([1, 48, 48, 1]))
+        
+        logger.info(f"Keras forward pass traced with tf.function (XLA: {Config.ENABLE_XLA})")
+        return predict_fn
+    
+    @property
+    def needs_color(self) -> bool:
+        """True jika face detector membutuhkan input BGR (YuNet); Haarcascade cukup grayscale"""
+        return self.face_detector is not None
+    
+    def _load_yunet(self):
+        """Load YuNet face detector (cv2.FaceDetectorYN)"""
+        if not os.path.exists(Config.YUNET_MODEL_PATH):
+            logger.warning(f"YuNet model not found at {Config.YUNET_MODEL_PATH}, falling back to Haarcascade")
+            return None
+        
+        try:
+            detector = cv2.FaceDetectorYN_create(
+                Config.YUNET_MODEL_PATH,
+                '',
+                (320, 320),
+                score_threshold=Config.YUNET_SCORE_THRESHOLD
+            )
+            
+            logger.info(f"YuNet face detector loaded successfully from {Config.YUNET_MODEL_PATH}")
+            return detector
+            
+        except Exception as e:
+            logger.warning(f"Failed to load YuNet, falling back to Haarcascade: {e}")
+            return None
+    
+    def _warmup(self):
+        """
+        Jalankan inference dummy untuk batch 1 dan MAX_FACES
+        
+        Request pertama biasanya jauh lebih lambat karena graph construction,
+        XLA compilation, cuDNN algorithm selection, atau alokasi tensor TFLite.
+        """
+        try:
+            for batch_size in sorted({1, Config.MAX_FACES}):
+                self._run_inference(np.zeros((batch_size, 48, 48, 1), np.float32))
+            logger.info("Model warmup completed")
+            
+        except Exception as e:
+            logger.warning(f"Model warmup failed: {e}")
+    
     def _load_cascade(self):
         """Load Haarcascade classifier"""
         try:
@@ -110,23 +415,82 @@ class EmotionPredictor:
             logger.error(f"Error in noise reduction: {e}")
             return image
     
+    def _downscale_for_detection(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Downscale image jika sisi terpanjang melebihi DETECTION_MAX_DIMENSION
+        
+        Returns:
+            Tuple (image hasil resize, scale factor terhadap image asli)
+        """
+        max_dim = max(image.shape[:2])
+        if max_dim <= Config.DETECTION_MAX_DIMENSION:
+            return image, 1.0
+        
+        scale = Config.DETECTION_MAX_DIMENSION / max_dim
+        resized = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return resized, scale
+    
+    def _detect_faces_yunet(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Face detection dengan YuNet, tanpa perlu NMS / false positive filter tambahan
+        """
+        # YuNet membutuhkan input BGR 3 channel
+        detect_image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+        detect_image, scale = self._downscale_for_detection(detect_image)
+        height, width = detect_image.shape[:2]
+        
+        # setInputSize + detect mengubah state detector, jadi dijaga dengan lock
+        with self._detector_lock:
+            self.face_detector.setInputSize((width, height))
+            _, detections = self.face_detector.detect(detect_image)
+        
+        if detections is None:
+            return []
+        
+        # Ambil deteksi dengan score tertinggi (kolom terakhir)
+        detections = detections[np.argsort(-detections[:, -1])][:Config.MAX_FACES]
+        
+        # Kembalikan koordinat ke resolusi asli dan clip ke batas image
+        img_h, img_w = image.shape[:2]
+        faces = []
+        for x, y, w, h in detections[:, :4] / scale:
+            x0, y0 = max(0, int(round(x))), max(0, int(round(y)))
+            x1, y1 = min(img_w, int(round(x + w))), min(img_h, int(round(y + h)))
+            if x1 > x0 and y1 > y0:
+                faces.append((x0, y0, x1 - x0, y1 - y0))
+        
+        return faces
+    
     def detect_faces_multi_scale(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """
         Optimized face detection untuk speed (reduced complexity)
         """
         try:
-            # Reduce noise first
-            processed_image = self.reduce_background_noise(image)
+            if self.face_detector is not None:
+                return self._detect_faces_yunet(image)
+            
+            # Haar cascade cukup dengan grayscale; blur + equalizeHist dilewati
+            # karena mengubah distribusi intensitas yang dipakai saat training cascade
+            processed_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+            
+            # Downscale image besar sebelum detection (kerja cascade sebanding luas image)
+            processed_image, scale = self._downscale_for_detection(processed_image)
+            
+            min_size = tuple(max(1, int(round(size * scale))) for size in Config.FACE_DETECTION_MIN_SIZE)
             
             # Single-scale detection untuk speed optimization
             faces = self.face_cascade.detectMultiScale(
                 processed_image,
                 scaleFactor=1.1,  # Fixed optimal value
                 minNeighbors=4,   # Fixed optimal value
-                minSize=Config.FACE_DETECTION_MIN_SIZE,
+                minSize=min_size,
                 flags=cv2.CASCADE_SCALE_IMAGE
             )
             
+            # Kembalikan koordinat ke resolusi image asli
+            if scale != 1.0 and len(faces) > 0:
+                faces = np.round(np.asarray(faces) / scale).astype(int)
+            
             # Simple duplicate removal dan size filtering
             if len(faces) > 0:
                 # Convert to list dan filter berdasarkan size
@@ -145,7 +509,7 @@ class EmotionPredictor:
                         if not is_duplicate:
                             filtered_faces.append((x, y, w, h))
                 
-                return filtered_faces[:3]  # Limit to 3 faces max for performance
+                return filtered_faces[:Config.MAX_FACES]  # Limit jumlah wajah untuk performance
             
             return []
             
@@ -161,34 +525,30 @@ class EmotionPredictor:
             if len(faces) == 0:
                 return []
             
-            filtered_faces = []
+            faces_arr = np.asarray(faces).reshape(-1, 4)
+            x, y, w, h = faces_arr.T
             
-            for (x, y, w, h) in faces:
-                # 1. Aspect ratio check (wajah umumnya persegi atau sedikit rectangular)
+            # 1. Aspect ratio check (wajah umumnya persegi atau sedikit rectangular)
+            with np.errstate(divide='ignore', invalid='ignore'):
                 aspect_ratio = w / h
-                if not (0.6 <= aspect_ratio <= 1.4):
-                    continue
-                
-                # 2. Size check
-                min_size = Config.FACE_DETECTION_MIN_SIZE[0]  # Use width as minimum
-                if w < min_size or h < min_size:
-                    continue
-                
-                # 3. Variance check (area wajah harus memiliki variance yang cukup)
-                try:
-                    face_roi = image[y:y+h, x:x+w]
-                    if face_roi.size > 0:
-                        variance = np.var(face_roi)
-                        if variance < 100:  # Threshold untuk variance
-                            continue
-                except:
-                    continue
-                
-                # 4. Check bounds
-                if x < 0 or y < 0 or x + w > image.shape[1] or y + h > image.shape[0]:
-                    continue
-                
-                filtered_faces.append((x, y, w, h))
+            aspect_ok = (aspect_ratio >= 0.6) & (aspect_ratio <= 1.4)
+            
+            # 2. Size check
+            min_size = Config.FACE_DETECTION_MIN_SIZE[0]  # Use width as minimum
+            size_ok = (w >= min_size) & (h >= min_size)
+            
+            # 3. Check bounds
+            bounds_ok = (x >= 0) & (y >= 0) & (x + w <= image.shape[1]) & (y + h <= image.shape[0])
+            
+            mask = aspect_ok & size_ok & bounds_ok
+            
+            # 4. Variance check (area wajah harus memiliki variance yang cukup),
+            # hanya untuk kandidat yang lolos check geometri
+            filtered_faces = []
+            for i in np.flatnonzero(mask):
+                fx, fy, fw, fh = (int(v) for v in faces_arr[i])
+                if np.var(image[fy:fy+fh, fx:fx+fw]) >= 100:  # Threshold untuk variance
+                    filtered_faces.append(faces[i])
             
             # Remove overlapping detections (Non-Maximum Suppression sederhana)
             if len(filtered_faces) > 1:
@@ -202,121 +562,215 @@ class EmotionPredictor:
     
     def non_max_suppression(self, faces: List[Tuple], overlap_threshold: float = 0.3) -> List[Tuple]:
         """
-        Simple Non-Maximum Suppression untuk remove overlapping detections
+        Non-Maximum Suppression untuk remove overlapping detections
+        
+        Menggunakan cv2.dnn.NMSBoxes (native C++) dengan luas box sebagai score,
+        sehingga deteksi terbesar yang dipertahankan.
         """
         if len(faces) == 0:
             return []
         
-        # Convert to format yang lebih mudah di-process
-        faces_array = np.array(faces)
-        x1 = faces_array[:, 0]
-        y1 = faces_array[:, 1]
-        x2 = faces_array[:, 0] + faces_array[:, 2]
-        y2 = faces_array[:, 1] + faces_array[:, 3]
-        areas = faces_array[:, 2] * faces_array[:, 3]
+        bboxes = [[int(x), int(y), int(w), int(h)] for (x, y, w, h) in faces]
+        scores = [float(w * h) for (_, _, w, h) in bboxes]
         
-        # Sort by area (descending)
-        indices = np.argsort(areas)[::-1]
+        keep = cv2.dnn.NMSBoxes(bboxes, scores, 0.0, overlap_threshold)
         
-        keep = []
-        while len(indices) > 0:
-            # Take the largest area
-            current = indices[0]
-            keep.append(current)
-            
-            if len(indices) == 1:
-                break
-            
-            # Calculate overlap dengan deteksi lainnya
-            other_indices = indices[1:]
-            
-            # Calculate intersection
-            xx1 = np.maximum(x1[current], x1[other_indices])
-            yy1 = np.maximum(y1[current], y1[other_indices])
-            xx2 = np.minimum(x2[current], x2[other_indices])
-            yy2 = np.minimum(y2[current], y2[other_indices])
-            
-            w = np.maximum(0, xx2 - xx1)
-            h = np.maximum(0, yy2 - yy1)
-            intersection = w * h
-            
-            # Calculate overlap ratio
-            union = areas[current] + areas[other_indices] - intersection
-            overlap_ratio = intersection / union
-            
-            # Keep detections dengan overlap ratio < threshold
-            indices = other_indices[overlap_ratio <= overlap_threshold]
-        
-        return [faces[i] for i in keep]
+        return [faces[int(i)] for i in np.array(keep).flatten()]
+    
+    def _get_input_buffer(self) -> np.ndarray:
+        """
+        Buffer input model (MAX_FACES, 48, 48, 1) float32 per thread, dialokasi sekali
+        """
+        input_buf = getattr(self._thread_local, 'input_buf', None)
+        if input_buf is None:
+            input_buf = np.empty((Config.MAX_FACES, 48, 48, 1), np.float32)
+            self._thread_local.input_buf = input_buf
+        return input_buf
+    
+    def _get_resize_buffer(self) -> np.ndarray:
+        """
+        Buffer uint8 48x48 per thread untuk hasil resize ROI wajah
+        """
+        resize_buf = getattr(self._thread_local, 'resize_buf', None)
+        if resize_buf is None:
+            resize_buf = np.empty((48, 48), np.uint8)
+            self._thread_local.resize_buf = resize_buf
+        return resize_buf
     
-    def preprocess_face_for_model(self, face_image: np.ndarray) -> np.ndarray:
+    def preprocess_face_for_model(self, face_image: np.ndarray, slot: int = 0) -> np.ndarray:
         """
         Preprocess face image untuk model input
+        
+        Hasil ditulis ke slot buffer input per-thread yang dipakai ulang, jadi
+        array yang dikembalikan akan tertimpa oleh pemanggilan berikutnya
+        pada slot yang sama.
+        
+        Args:
+            face_image: ROI wajah BGR atau grayscale
+            slot: Index wajah di dalam batch (0 <= slot < MAX_FACES)
+        
+        Returns:
+            View (1, 48, 48, 1) float32 dalam range [0, 1]
         """
         try:
-            # Convert to grayscale jika masih color
-            if len(face_image.shape) == 3:
+            # Input grayscale langsung dipakai; ROI BGR hanya datang dari jalur YuNet
+            if face_image.ndim == 3:
                 face_gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
             else:
                 face_gray = face_image
             
-            # Resize ke 48x48 (sesuai training model)
-            face_resized = cv2.resize(face_gray, (48, 48))
-            
-            # Normalize ke range [0, 1]
-            face_normalized = face_resized.astype('float32') / 255.0
+            # Resize ke 48x48 (sesuai training model); INTER_AREA lebih baik untuk shrinking
+            face_resized = cv2.resize(
+                face_gray, (48, 48), dst=self._get_resize_buffer(), interpolation=cv2.INTER_AREA
+            )
             
-            # Add batch dan channel dimensions
-            face_input = np.expand_dims(face_normalized, axis=[0, -1])
+            # Normalize ke range [0, 1] + convert float32 dalam satu pass langsung ke buffer
+            # (batch dan channel dimension sudah ada)
+            input_buf = self._get_input_buffer()
+            cv2.multiply(face_resized, 1.0 / 255.0, dst=input_buf[slot, :, :, 0], dtype=cv2.CV_32F)
             
-            return face_input
+            return input_buf[slot:slot + 1]
             
         except Exception as e:
             logger.error(f"Error in face preprocessing: {e}")
             return None
     
-    def predict_emotion(self, image: np.ndarray) -> Dict[str, Any]:
+    def _run_tflite(self, face_input: np.ndarray) -> np.ndarray:
+        """
+        Jalankan TFLite interpreter dengan quantize input / dequantize output
+        
+        Input tensor di-resize jika jumlah wajah di batch berubah.
+        """
+        scale, zero_point = self._input_details['quantization']
+        if scale:
+            dtype_info = np.iinfo(self._input_details['dtype'])
+            face_input = np.clip(np.round(face_input / scale + zero_point), dtype_info.min, dtype_info.max)
+            face_input = face_input.astype(self._input_details['dtype'])
+        
+        with self._interpreter_lock:
+            if tuple(self._input_details['shape']) != face_input.shape:
+                self.interpreter.resize_tensor_input(self._input_details['index'], face_input.shape)
+                self.interpreter.allocate_tensors()
+                self._input_details = self.interpreter.get_input_details()[0]
+                self._output_details = self.interpreter.get_output_details()[0]
+            
+            self.interpreter.set_tensor(self._input_details['index'], face_input)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output_details['index'])
+        
+        scale, zero_point = self._output_details['quantization']
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        
+        return output
+    
+    def _run_inference(self, face_input: np.ndarray) -> np.ndarray:
+        """
+        Forward pass model untuk batch input (N, 48, 48, 1)
+        """
+        if self._trt_infer is not None:
+            outputs = self._trt_infer(**{self._trt_input_name: tf.constant(face_input)})
+            return next(iter(outputs.values())).numpy()
+        
+        if self.interpreter is not None:
+            return self._run_tflite(face_input)
+        
+        # Graph yang sudah di-trace, tanpa overhead tf.data dari model.predict
+        return self._predict_fn(tf.constant(face_input)).numpy()
+    
+    def _frame_hash(self, image: np.ndarray) -> Tuple[Tuple[int, ...], bytes]:
+        """
+        Key cache frame: shape image + perceptual hash (dHash 9x8)
+        
+        dHash tidak bergantung pada resolusi, jadi shape ikut di key agar
+        bounding box hasil cache selalu sesuai dengan ukuran frame.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        return image.shape, np.packbits(small[:, 1:] > small[:, :-1]).tobytes()
+    
+    def _remember_prediction(self, frame_key: Optional[Tuple], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Simpan hasil prediksi terakhir untuk cache frame berikutnya"""
+        if frame_key is not None:
+            # Simpan copy karena caller (app.py) menambah key ke dict hasil;
+            # di-assign sebagai satu tuple agar aman dibaca thread lain
+            self._last_prediction = (frame_key, dict(result), time.perf_counter())
+        return result
+    
+    def predict_emotion(self, image: np.ndarray, use_cache: bool = True) -> Dict[str, Any]:
         """
         Main function untuk predict emotion dari image
+        
+        Args:
+            image: Image BGR (H, W, 3) atau grayscale (H, W)
+            use_cache: Pakai cache frame terakhir (hanya untuk satu stream webcam);
+                set False untuk gambar independen seperti file upload
         """
-        import time
-        start_time = time.time()
+        start_time = time.perf_counter()
+        profiling = Config.ENABLE_PROFILING
         
         try:
+            # Frame webcam yang (hampir) sama dengan request sebelumnya pakai hasil cache;
+            # TTL memastikan prediksi asli tetap berjalan berkala walau hash tidak berubah
+            frame_key = None
+            if use_cache and Config.ENABLE_PREDICTION_CACHE:
+                frame_key = self._frame_hash(image)
+                last_prediction = self._last_prediction
+                if (last_prediction is not None and last_prediction[0] == frame_key
+                        and start_time - last_prediction[2] < Config.PREDICTION_CACHE_TTL):
+                    return dict(
+                        last_prediction[1],
+                        cached=True,
+                        processing_time_ms=round((time.perf_counter() - start_time) * 1000, 2)
+                    )
+            
             # Detect faces
-            face_detect_start = time.time()
+            if profiling:
+                face_detect_start = time.perf_counter()
             faces = self.detect_faces_multi_scale(image)
-            face_detect_time = (time.time() - face_detect_start) * 1000
+            if profiling:
+                face_detect_time = (time.perf_counter() - face_detect_start) * 1000
             
             if len(faces) == 0:
-                return {
+                return self._remember_prediction(frame_key, {
                     'success': False,
                     'message': 'No face detected',
                     'faces_detected': 0,
                     'emotions': [],
-                    'processing_time_ms': round((time.time() - start_time) * 1000, 2)
-                }
+                    'processing_time_ms': round((time.perf_counter() - start_time) * 1000, 2)
+                })
             
-            results = []
-            model_predict_time = 0
+            # Preprocess semua wajah ke slot buffer input, lalu predict dalam satu batch
+            face_boxes = []
             
-            for i, (x, y, w, h) in enumerate(faces):
+            for i, (x, y, w, h) in enumerate(faces[:Config.MAX_FACES]):
                 # Extract face ROI
                 face_roi = image[y:y+h, x:x+w]
                 
                 # Preprocess untuk model
-                processed_face = self.preprocess_face_for_model(face_roi)
+                processed_face = self.preprocess_face_for_model(face_roi, slot=len(face_boxes))
                 
                 if processed_face is not None:
-                    # Predict emotion
-                    predict_start = time.time()
-                    prediction = self.model.predict(processed_face, verbose=0)
-                    predict_time = (time.time() - predict_start) * 1000
-                    model_predict_time += predict_time
-                    
-                    predicted_class = np.argmax(prediction[0])
-                    confidence = float(np.max(prediction[0]))
-                    
+                    face_boxes.append((i, x, y, w, h))
+            
+            results = []
+            model_predict_time = 0
+            
+            if face_boxes:
+                # Predict emotion untuk (N, 48, 48, 1) sekaligus
+                batch = self._get_input_buffer()[:len(face_boxes)]
+                if profiling:
+                    predict_start = time.perf_counter()
+                predictions = self._run_inference(batch)
+                if profiling:
+                    model_predict_time = (time.perf_counter() - predict_start) * 1000
+                    predict_time = model_predict_time / len(face_boxes)
+                
+                # Argmax untuk seluruh batch sekaligus, lalu convert ke Python float sekali jalan
+                predicted_classes = predictions.argmax(axis=1).tolist()
+                probabilities = predictions.tolist()
+                
+                for (i, x, y, w, h), predicted_class, prediction in zip(face_boxes, predicted_classes, probabilities):
                     emotion_result = {
                         'face_id': i + 1,
                         'bounding_box': {
@@ -326,30 +780,31 @@ class EmotionPredictor:
                             'height': int(h)
                         },
                         'emotion': self.emotion_labels[predicted_class],
-                        'confidence': confidence,
-                        'prediction_time_ms': round(predict_time, 2),
-                        'all_predictions': {
-                            self.emotion_labels[j]: float(prediction[0][j]) 
-                            for j in range(len(prediction[0]))
-                        }
+                        'confidence': prediction[predicted_class],
+                        'all_predictions': dict(zip(self.emotion_labels, prediction))
                     }
+                    if profiling:
+                        emotion_result['prediction_time_ms'] = round(predict_time, 2)
                     
                     results.append(emotion_result)
             
-            total_time = (time.time() - start_time) * 1000
+            total_time = (time.perf_counter() - start_time) * 1000
             
-            return {
+            result = {
                 'success': True,
                 'faces_detected': len(faces),
                 'emotions': results,
                 'message': f'Successfully detected {len(faces)} face(s)',
-                'processing_time_ms': round(total_time, 2),
-                'timing_breakdown_ms': {
+                'processing_time_ms': round(total_time, 2)
+            }
+            if profiling:
+                result['timing_breakdown_ms'] = {
                     'face_detection': round(face_detect_time, 2),
                     'model_prediction': round(model_predict_time, 2),
                     'total': round(total_time, 2)
                 }
-            }
+            
+            return self._remember_prediction(frame_key, result)
             
         except Exception as e:
             logger.error(f"Error in emotion prediction: {e}")
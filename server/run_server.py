@@ -6,15 +6,44 @@ Startup script with configuration options
 
 import os
 import sys
+import shutil
 import argparse
-from app import app, predictor
+import warnings
 from config import Config
 
+def run_gunicorn(host, port, threads):
+    """
+    Jalankan production server dengan Gunicorn (1 worker, gthread)
+    
+    Satu worker menghindari duplikasi model TensorFlow antar proses;
+    thread pool menangani request secara concurrent. Proses ini di-replace
+    oleh Gunicorn sehingga model hanya di-load di dalam worker.
+    """
+    gunicorn = shutil.which('gunicorn')
+    if gunicorn is None:
+        print("Error: gunicorn not found. Install it with 'pip install gunicorn' or use --dev-server")
+        sys.exit(1)
+    
+    command = [
+        gunicorn,
+        '--workers=1',
+        f'--threads={threads}',
+        '--worker-class=gthread',
+        f'--bind={host}:{port}',
+        # Loading + konversi model di worker bisa lebih lama dari default 30s
+        '--timeout=120',
+        f'--chdir={os.path.dirname(os.path.abspath(__file__))}',
+        'wsgi:app'
+    ]
+    os.execv(gunicorn, command)
+
 def main():
     parser = argparse.ArgumentParser(description='Neo Telemetri Emotion Recognition Server')
     parser.add_argument('--host', default=Config.HOST, help='Host to bind to')
     parser.add_argument('--port', type=int, default=Config.PORT, help='Port to bind to')
-    parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--debug', action='store_true', help='Enable debug mode (uses Flask development server)')
+    parser.add_argument('--dev-server', action='store_true', help='Use Flask development server instead of Gunicorn')
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS, help='Gunicorn worker threads')
     parser.add_argument('--model-path', default=Config.MODEL_PATH, help='Path to emotion model')
     parser.add_argument('--cascade-path', default=Config.CASCADE_PATH, help='Path to Haarcascade file')
     parser.add_argument('--env-file', default='.env', help='Path to environment file')
@@ -46,12 +75,6 @@ def main():
         print("Please ensure the haarcascade_frontalface_default.xml file is in the correct location.")
         sys.exit(1)
     
-    # Check if predictor is initialized
-    if predictor is None:
-        print("Error: Failed to initialize emotion predictor")
-        print("Please check the model and cascade file paths")
-        sys.exit(1)
-    
     print("=" * 60)
     print("Neo Telemetri Facial Emotion Recognition Server")
     print("=" * 60)
@@ -73,11 +96,37 @@ def main():
     print("  POST /predict_file - Predict emotion from uploaded file")
     print("=" * 60)
     
+    use_dev_server = args.dev_server or args.debug
+    if not use_dev_server:
+        print(f"Starting Gunicorn (1 worker, {args.threads} threads)")
+        run_gunicorn(args.host, args.port, args.threads)
+    
+    debug = args.debug or Config.DEBUG
+    if Config.FLASK_ENV == 'production':
+        # Debug reloader fork child process yang import ulang TensorFlow (startup lama + memory 2x)
+        if debug:
+            print("Error: Refusing to run in debug mode with FLASK_ENV=production")
+            sys.exit(1)
+        warnings.warn(
+            "Flask development server is not intended for production; "
+            "run without --dev-server to use Gunicorn",
+            DeprecationWarning
+        )
+    
+    from app import app, predictor
+    
+    # Check if predictor is initialized
+    if predictor is None:
+        print("Error: Failed to initialize emotion predictor")
+        print("Please check the model and cascade file paths")
+        sys.exit(1)
+    
     try:
         app.run(
             host=args.host,
             port=args.port,
-            debug=args.debug or Config.FLASK_DEBUG,
+            debug=debug,
+            use_reloader=False,
             threaded=True
         )
     except KeyboardInterrupt:
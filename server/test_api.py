@@ -1,26 +1,112 @@
 import requests
-import base64
 import json
+import functools
+import gzip
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from PIL import Image
-import io
+
+# pybase64 (SIMD) jika tersedia, fallback ke stdlib base64
+try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+def _b64encode_as_string(data):
+    """Base64-encode bytes-like object langsung ke str ASCII"""
+    return _b64.b64encode(data).decode('ascii')
+
+# pybase64 bisa encode langsung ke str tanpa intermediate bytes object
+_b64encode_as_string = getattr(_b64, 'b64encode_as_string', _b64encode_as_string)
+
+# orjson (SIMD, Rust) untuk serialisasi JSON jika tersedia
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# PyTurboJPEG untuk encode JPEG jika library tersedia, fallback ke cv2.imencode
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
+
+@functools.lru_cache(maxsize=32)
+def encode_image_file(image_path):
+    """
+    Convert image file to base64 string
+    
+    File di-mmap sehingga encoder membaca langsung dari page cache
+    tanpa alokasi bytes sebesar file. Hasil di-cache per path karena
+    fixture yang sama biasanya dikirim berulang kali; panggil
+    encode_image_file.cache_clear() jika file berubah.
+    """
+    with open(image_path, "rb") as image_file:
+        if os.fstat(image_file.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            encoded_string = _b64encode_as_string(mapped)
+    return encoded_string
 
 class EmotionAPIClient:
     """
     Client untuk testing Neo Telemetri Emotion Recognition API
     """
     
-    def __init__(self, base_url="http://localhost:5000"):
+    # Quality 85 tanpa progressive/optimize: payload jauh lebih kecil dari
+    # default (95) dan encode lebih cepat untuk single-shot request
+    JPEG_QUALITY = 85
+    JPEG_ENCODE_PARAMS = [
+        int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY,
+        int(cv2.IMWRITE_JPEG_PROGRESSIVE), 0,
+        int(cv2.IMWRITE_JPEG_OPTIMIZE), 0
+    ]
+    
+    # Jumlah frame buffer driver yang dibuang sebelum mengambil frame terbaru
+    STALE_FRAMES = 5
+    
+    # Jumlah frame yang dibaca saat webcam pertama dibuka agar auto-exposure settle
+    WARMUP_FRAMES = 5
+    
+    def __init__(self, base_url="http://localhost:5000", pool_size=8, compress=False):
+        """
+        Args:
+            base_url: URL server API
+            pool_size: Ukuran connection pool HTTP
+            compress: Kompres body JSON dengan gzip (Content-Encoding: gzip);
+                server /predict mendukung ini
+        """
         self.base_url = base_url
+        self.compress = compress
+        
+        # Satu Session untuk semua request: koneksi keep-alive dipakai ulang
+        self.session = requests.Session()
+        self._mount_adapter(pool_size)
+        self.session.headers['Content-Type'] = 'application/json'
+        
+        # Webcam dibuka lazy dan dipakai ulang (lihat _get_capture)
+        self._cap = None
+        
+        # Buffer noise untuk test_noisy_background, dialokasi ulang hanya jika ukuran image berubah
+        self._noise_buf = None
+    
+    def _mount_adapter(self, pool_size):
+        """
+        Mount HTTPAdapter dengan connection pool sebesar pool_size
+        """
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._pool_size = pool_size
     
     def encode_image_to_base64(self, image_path):
         """
-        Convert image file to base64 string
+        Convert image file to base64 string (cached per path)
         """
-        with open(image_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        return encoded_string
+        return encode_image_file(image_path)
     
     def predict_from_file(self, image_path):
         """
@@ -30,65 +116,180 @@ class EmotionAPIClient:
             # Encode image
             image_b64 = self.encode_image_to_base64(image_path)
             
-            # Prepare request
-            payload = {
-                "image": f"data:image/jpeg;base64,{image_b64}"
-            }
-            
             # Send request
-            response = requests.post(
-                f"{self.base_url}/predict",
-                json=payload,
-                headers={'Content-Type': 'application/json'}
-            )
+            return self._post_image_b64(image_b64)
             
-            return response.json()
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def predict_batch(self, image_paths, max_workers=8):
+        """
+        Predict emotion dari banyak file secara paralel
+        
+        Request dijalankan di thread pool dan berbagi Session yang sama;
+        connection pool diperbesar agar setiap worker punya koneksi sendiri.
+        
+        Returns:
+            List hasil dengan urutan yang sama seperti image_paths
+        """
+        if max_workers > self._pool_size:
+            self._mount_adapter(max_workers)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.predict_from_file, image_paths))
+    
+    def predict_from_file_binary(self, image_path):
+        """
+        Predict emotion from image file path, dikirim sebagai raw bytes
+        
+        Body berisi JPEG mentah (Content-Type: image/jpeg) tanpa base64 + JSON,
+        ~25% lebih kecil dan tanpa encode/decode base64 di kedua sisi.
+        Endpoint /predict menerima format ini selain base64 JSON.
+        """
+        try:
+            with open(image_path, "rb") as image_file:
+                image_bytes = image_file.read()
+            
+            return self._post_image_bytes(image_bytes)
             
         except Exception as e:
             return {"error": str(e)}
     
-    def predict_from_webcam(self, duration=5):
+    def _encode_jpeg(self, image):
         """
-        Capture from webcam and predict emotion
+        Encode image BGR ke JPEG bytes
+        
+        TurboJPEG (libjpeg-turbo SIMD, langsung dari array BGR) dipakai jika
+        tersedia, selain itu cv2.imencode dengan JPEG_ENCODE_PARAMS.
+        
+        Returns:
+            JPEG bytes, atau None jika encode gagal
         """
-        cap = cv2.VideoCapture(0)
+        if _turbo_jpeg is not None:
+            return _turbo_jpeg.encode(image, quality=self.JPEG_QUALITY, pixel_format=TJPF_BGR)
         
+        ok, buffer = cv2.imencode('.jpg', image, self.JPEG_ENCODE_PARAMS)
+        return buffer.tobytes() if ok else None
+    
+    def _parse_response(self, response):
+        """
+        Parse JSON response langsung dari bytes (tanpa decode body ke str dulu)
+        """
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return json.loads(response.content)
+    
+    def _post_image_b64(self, image_b64, image_format="jpeg"):
+        """
+        POST base64 image ke endpoint /predict
+        
+        Base64 dikirim tanpa prefix data URI ("data:image/jpeg;base64,");
+        server menerima keduanya, dan tanpa prefix tidak perlu membuat copy
+        string base64 hanya untuk concatenation.
+        """
+        payload = {
+            "image": image_b64,
+            "format": image_format
+        }
+        
+        body = orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode('ascii')
+        headers = {}
+        
+        # Level 1: hampir secepat memcpy tapi tetap memperkecil payload base64
+        if self.compress:
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        
+        # Session sudah set Content-Type application/json
+        response = self.session.post(f"{self.base_url}/predict", data=body, headers=headers)
+        
+        return self._parse_response(response)
+    
+    def _post_image_bytes(self, image_bytes):
+        """
+        POST raw JPEG bytes ke endpoint /predict
+        """
+        response = self.session.post(
+            f"{self.base_url}/predict",
+            data=image_bytes,
+            headers={'Content-Type': 'image/jpeg'}
+        )
+        
+        return self._parse_response(response)
+    
+    def _get_capture(self):
+        """
+        Buka webcam sekali dan pakai ulang VideoCapture di pemanggilan berikutnya
+        
+        Returns:
+            cv2.VideoCapture, atau None jika webcam tidak bisa dibuka
+        """
+        if self._cap is not None and self._cap.isOpened():
+            return self._cap
+        
+        cap = cv2.VideoCapture(0)
         if not cap.isOpened():
+            cap.release()
+            return None
+        
+        # Baca dan buang beberapa frame agar auto-exposure settle (hanya saat pertama dibuka);
+        # umumnya 3-5 frame cukup, jauh lebih cepat dari sleep tetap
+        for _ in range(self.WARMUP_FRAMES):
+            cap.read()
+        
+        self._cap = cap
+        return cap
+    
+    def close(self):
+        """
+        Release webcam dan tutup HTTP session
+        """
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self.session.close()
+    
+    def __del__(self):
+        cap = getattr(self, '_cap', None)
+        if cap is not None:
+            cap.release()
+    
+    def predict_from_webcam(self, duration=5, binary=False):
+        """
+        Capture from webcam and predict emotion
+        
+        Args:
+            duration: Durasi capture (detik), hanya informasi
+            binary: Kirim JPEG sebagai raw bytes, bukan base64 JSON
+        """
+        cap = self._get_capture()
+        
+        if cap is None:
             return {"error": "Could not open webcam"}
         
         print(f"Capturing from webcam for {duration} seconds...")
         
-        # Capture frame after few seconds
-        import time
-        time.sleep(2)
-        
-        ret, frame = cap.read()
-        cap.release()
+        # Buang frame lama yang masih di-buffer driver, lalu ambil frame terbaru
+        for _ in range(self.STALE_FRAMES):
+            cap.grab()
+        ret, frame = cap.retrieve()
         
         if not ret:
             return {"error": "Could not capture frame"}
         
-        # Convert to PIL Image
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(frame_rgb)
+        # Encode frame BGR langsung ke JPEG (tanpa PIL round-trip)
+        jpeg_bytes = self._encode_jpeg(frame)
+        if jpeg_bytes is None:
+            return {"error": "Could not encode frame"}
+        
+        if binary:
+            return self._post_image_bytes(jpeg_bytes)
         
         # Convert to base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format='JPEG')
-        image_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        image_b64 = _b64encode_as_string(jpeg_bytes)
         
         # Predict
-        payload = {
-            "image": f"data:image/jpeg;base64,{image_b64}"
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/predict",
-            json=payload,
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        return response.json()
+        return self._post_image_b64(image_b64)
     
     def test_noisy_background(self, image_path):
         """
@@ -97,35 +298,29 @@ class EmotionAPIClient:
         # Load image
         image = cv2.imread(image_path)
         
-        # Add noise to background
-        h, w = image.shape[:2]
-        noise = np.random.randint(0, 50, (h, w, 3), dtype=np.uint8)
-        noisy_image = cv2.add(image, noise)
+        # Add noise to background: cv2.randu (SIMD RNG) mengisi buffer noise yang
+        # dipakai ulang, lalu saturating add in-place ke image
+        if self._noise_buf is None or self._noise_buf.shape != image.shape:
+            self._noise_buf = np.empty_like(image)
+        # Batas per channel: scalar tunggal hanya mengisi channel pertama
+        channels = image.shape[2] if image.ndim == 3 else 1
+        cv2.randu(self._noise_buf, (0,) * channels, (50,) * channels)
+        noisy_image = cv2.add(image, self._noise_buf, dst=image)
         
         # Convert to base64
-        _, buffer = cv2.imencode('.jpg', noisy_image)
-        image_b64 = base64.b64encode(buffer).decode('utf-8')
+        _, buffer = cv2.imencode('.jpg', noisy_image, self.JPEG_ENCODE_PARAMS)
+        image_b64 = _b64encode_as_string(buffer)
         
         # Predict
-        payload = {
-            "image": f"data:image/jpeg;base64,{image_b64}"
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/predict",
-            json=payload,
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        return response.json()
+        return self._post_image_b64(image_b64)
     
     def health_check(self):
         """
         Check API health
         """
         try:
-            response = requests.get(f"{self.base_url}/health")
-            return response.json()
+            response = self.session.get(f"{self.base_url}/health")
+            return self._parse_response(response)
         except Exception as e:
             return {"error": str(e)}
 
@@ -160,10 +355,18 @@ def main():
         print(f"Webcam test failed: {str(e)}")
     print()
     
+    # Test batch of images in parallel (uncomment when you have images)
+    # print("4. Test batch of image files:")
+    # batch_results = client.predict_batch(["path/to/image1.jpg", "path/to/image2.jpg"])
+    # print(json.dumps(batch_results, indent=2))
+    # print()
+    
     # Test noisy background (uncomment when you have an image)
-    # print("4. Test with noisy background:")
+    # print("5. Test with noisy background:")
     # noisy_result = client.test_noisy_background("path/to/your/test/image.jpg")
     # print(json.dumps(noisy_result, indent=2))
+    
+    client.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,20 @@
+"""
+WSGI entry point untuk production server (Gunicorn)
+
+    gunicorn --workers=1 --threads=8 --worker-class=gthread --bind 0.0.0.0:5000 wsgi:app
+
+Satu worker agar model hanya di-load sekali per proses; concurrency
+request ditangani oleh thread pool gthread.
+"""
+
+from app import app, predictor
+
+# Gagal boot worker (seperti run_server.py) daripada melayani 500 di setiap request
+if predictor is None:
+    raise RuntimeError(
+        "Failed to initialize emotion predictor; "
+        "please check the model and cascade file paths"
+    )
+
+if __name__ == '__main__':
+    app.run()